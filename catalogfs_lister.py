@@ -117,7 +117,7 @@ you should mount the index with CatalogFS filesystem as described below.
 '''
 
 '''
-Usage: catalogfs_lister.py [-h] [-s] [-c] [-d] [-x] source_dir output_dir
+Usage: catalogfs_lister.py [-h] [-s] [-b] [-c] [-d] [-x] [-j JOBS] [-q] source_dir output_dir
 
 Make a CatalogFS-compartible index (snapshot) of the source directory.
 
@@ -128,6 +128,8 @@ positional arguments:
 optional arguments:
   -h, --help                show this help message and exit.
   -s, --sha256              calculate and store SHA256 hashes (much slower).
+  -b, --blake3              calculate and store BLAKE3 hashes (requires blake3 module,
+                            index-only field that other CatalogFS tools may not support).
   -c, --continue            continue indexing (ignore and skip existing output files)
   -d, --data-only           take only information that is needed to compare the
                             content to allow easy comparing and diff.
@@ -135,18 +137,23 @@ optional arguments:
                             content and modification time.
   -x, --source-is-cfsfiles  source directory already has only CatalogFS-files
                             (small files with meta-information).
+  -j JOBS, --jobs JOBS      number of parallel threads for files and processes
+                            for hashes calculation (default is the number of CPUs).
+  -q, --quiet               print only errors (no messages about every listed
+                            file and directory).
 
 '''
 
 
 # All CFSFile format versions
+# NOTE: modules that are needed only by some options (hashing, parallel processing,
+# symlinks copying) are imported where they are used to make start of the script faster
 import os
 import sys
 import stat
-import shutil
-from pathlib import Path
-import argparse
-import hashlib
+from collections.abc import Callable
+import functools
+import threading
 CFSFILE_VERSION_1: int = 1
 CFSFILE_VERSION_2: int = 2
 CFSFILE_VERSION_3: int = 3
@@ -159,6 +166,27 @@ FORMAT_NEW_LINE_CHAR_2: str = '\r'
 FORMAT_NEW_LINE_LENGTH: int = 1
 FORMAT_TRIMMING_CHARS: str = ' \t\r\n'
 
+# Current CFSFile format's constants as bytes (content is parsed without decoding)
+FORMAT_FIELD_DELIMITER_BYTES: bytes = FORMAT_FIELD_DELIMITER.encode('ascii')
+FORMAT_NEW_LINE_BYTES: bytes = FORMAT_NEW_LINE_CHAR.encode('ascii')
+FORMAT_NEW_LINE_BYTES_2: bytes = FORMAT_NEW_LINE_CHAR_2.encode('ascii')
+FORMAT_TRIMMING_BYTES: bytes = FORMAT_TRIMMING_CHARS.encode('ascii')
+
+# Times are split to seconds and nanoseconds from os.stat_result's st_*time_ns fields
+NS_PER_SEC: int = 1000000000
+
+# Output files and directories are created relative to the opened parent directory if OS supports it
+FLAG_USE_DIR_FD: bool = (hasattr(os, 'O_DIRECTORY')
+                         and {os.open, os.mkdir, os.stat} <= os.supports_dir_fd)
+
+# Maximum number of files that are found by walking but not processed yet (when files are processed by threads).
+# Output directories of these files are kept open, so it's also a limit of open descriptors.
+FILES_MAX_PENDING: int = 256
+
+# Minimum size of file to calculate its checksums by a worker process (when files are processed by threads).
+# hashlib releases GIL, so smaller files are hashed by threads without inter-process overhead.
+CHECKSUMS_PROCESS_MIN_SIZE: int = 8388608
+
 # Limit maximum stats file to 1MiB. More than enough for any stat file possible.
 FORMAT_MAX_FILE_SIZE: int = 1048576
 
@@ -166,6 +194,31 @@ FORMAT_MAX_FILE_SIZE: int = 1048576
 FORMAT_HEADER_NAME: str = 'CatalogFS'
 FORMAT_HEADER_TO_WRITE: str = f"{FORMAT_HEADER_NAME}{FORMAT_FIELD_DELIMITER}{CFSFILE_CURRENT_VERSION}{FORMAT_NEW_LINE_CHAR}"
 FORMAT_HEADER_PREFIX_OLD_FORMAT: str = 'CatalogFS.File.'
+FORMAT_HEADER_PREFIX_OLD_FORMAT_BYTES: bytes = FORMAT_HEADER_PREFIX_OLD_FORMAT.encode('ascii')
+
+# Precomputed header and field templates (bytes formatting) for writing CFSFiles
+FORMAT_HEADER_TO_WRITE_BYTES: bytes = FORMAT_HEADER_TO_WRITE.encode('ascii')
+FORMAT_FIELD_TEMPLATE_SIZE: bytes = f'size{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_BLOCKS: bytes = f'blocks{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_MODE: bytes = f'mode{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_UID: bytes = f'uid{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_GID: bytes = f'gid{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_ATIME: bytes = f'atime{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_MTIME: bytes = f'mtime{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_CTIME: bytes = f'ctime{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_ATIMENSEC: bytes = f'atimensec{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_MTIMENSEC: bytes = f'mtimensec{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_CTIMENSEC: bytes = f'ctimensec{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_NLINK: bytes = f'nlink{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_BLKSIZE: bytes = f'blksize{FORMAT_FIELD_DELIMITER}%d{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_SHA256: bytes = f'sha256{FORMAT_FIELD_DELIMITER}%s{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+FORMAT_FIELD_TEMPLATE_BLAKE3: bytes = f'blake3{FORMAT_FIELD_DELIMITER}%s{FORMAT_NEW_LINE_CHAR}'.encode('ascii')
+
+# Names of CFSFile fields with integer values (same for all format versions)
+FORMAT_INT_FIELDS: frozenset = frozenset((
+    'size', 'blocks', 'mode', 'uid', 'gid',
+    'atime', 'mtime', 'ctime', 'atimensec', 'mtimensec', 'ctimensec',
+    'nlink', 'blksize'))
 
 
 class bcolors:
@@ -186,8 +239,13 @@ class CFSFile:
     """
     Main class for keeping CFSFile data (info about file).
     Class is similar to os.stat_result but not the same.
+    Uses __slots__ because an instance is created for every listed file.
     """
 
+    __slots__ = ('size', 'blocks', 'mode', 'uid', 'gid',
+                 'atime', 'mtime', 'ctime', 'atimensec', 'mtimensec', 'ctimensec',
+                 'nlink', 'blksize', 'sha256', 'blake3')
+
     def __init__(self):
         self.size: int = None
         self.blocks: int = None
@@ -203,16 +261,41 @@ class CFSFile:
         self.nlink: int = None
         self.blksize: int = None
         self.sha256: str = None
+        self.blake3: str = None
+
+
+# Files can be processed by several threads, so messages are printed under the lock
+# to prevent them from being interleaved
+PRINT_LOCK: threading.Lock = threading.Lock()
 
 
-def print_ok(s: str):
+def print_ok(s: str, path: str = None):
     """
     Print message with OK-color.
+    Path is corrected for printing here (see correct_utf8_pathstring),
+    so nothing is done for it when OK-messages are not printed (see print_nothing).
+
+    :param s: message
+    :type s: str
+    :param path: path to print after the message, defaults to None
+    :type path: str, optional
+    """
+    if path is not None:
+        s = f'{s}: {correct_utf8_pathstring(path)}'
+    with PRINT_LOCK:
+        print(f'{bcolors.OKGREEN}[ OK  ]{bcolors.ENDC}: {s}', flush=True)
+
+
+def print_nothing(s: str, path: str = None):
+    """
+    Ignore message. Replaces print_ok in quiet mode.
 
     :param s: message
     :type s: str
+    :param path: path to print after the message, defaults to None
+    :type path: str, optional
     """
-    print(f'{bcolors.OKGREEN}[ OK  ]{bcolors.ENDC}: {s}', flush=True)
+    pass
 
 
 def print_error(s: str):
@@ -222,7 +305,8 @@ def print_error(s: str):
     :param s: message
     :type s: str
     """
-    print(f'{bcolors.FAIL}[ERROR]{bcolors.ENDC}: {s}', flush=True)
+    with PRINT_LOCK:
+        print(f'{bcolors.FAIL}[ERROR]{bcolors.ENDC}: {s}', flush=True)
 
 
 def correct_utf8_pathstring(s: str) -> str:
@@ -235,89 +319,127 @@ def correct_utf8_pathstring(s: str) -> str:
     :return: corrected path string
     :rtype: str
     """
-    return str(s).encode('utf-8', 'replace').decode('utf-8')
+    s = str(s)
+    if s.isascii():
+        return s
+    return s.encode('utf-8', 'replace').decode('utf-8')
 
 
-def does_exist(path: Path, expected_type: int) -> bool:
+def is_correct_utf8_pathstring(s: str) -> bool:
     """
-    Check if file (can be symlink) exists with provided path and optional type.
+    Check if path has only correct UTF-8 chars (incorrect bytes are decoded by os functions as surrogates).
+    ASCII-only path is correct without encoding, and str.isascii() does not even scan the string.
+
+    :param s: path to check
+    :type s: str
+    :return: True if path can be encoded to UTF-8, False otherwise
+    :rtype: bool
+    """
+    if s.isascii():
+        return True
+    try:
+        s.encode('utf-8')
+    except UnicodeError:
+        return False
+    return True
+
+
+def path_for_dir_fd(path: str, dir_fd: int) -> str:
+    """
+    Get path to use with dir_fd argument of os functions.
+    It's the name of the file if directory's descriptor is provided, so only one path component is resolved.
+
+    :param path: full path of the file
+    :type path: str
+    :param dir_fd: descriptor of the directory containing the file or None
+    :type dir_fd: int
+    :return: name of the file if dir_fd is provided, otherwise the full path
+    :rtype: str
+    """
+    if dir_fd is None:
+        return path
+    return os.path.basename(path)
+
+
+def entry_matches_type(entry: os.DirEntry, expected_type: int) -> bool:
+    """
+    Check if directory entry (can be symlink) has provided type.
     Types are: 0 (any type), stat.S_IFDIR, stat.S_IFREG, stat.S_IFLNK.
-    Uses lstat to avoid wrong result of exists() function for invalid symlink.
+    The type is usually known from reading the directory, so no stat call is needed.
 
-    :param path: path to check
-    :type path: Path
+    :param entry: directory entry to check
+    :type entry: os.DirEntry
     :param expected_type: type to check against, 0 means any type (no check)
     :type expected_type: int
-    :return: True if the file exists and has excepted type, False otherwise
+    :return: True if the entry has excepted type, False otherwise
     :rtype: bool
     """
     try:
-        # we use lstat to avoid wrong result of exists() function for invalid symlink
-        st: os.stat_result = os.lstat(path)
-
-        # we use if-cases instead of bit operations over st_mode to be more portable in the future
         if expected_type == 0:
             return True
         elif expected_type == stat.S_IFDIR:
-            return stat.S_ISDIR(st.st_mode)
+            return entry.is_dir(follow_symlinks=False)
         elif expected_type == stat.S_IFREG:
-            return stat.S_ISREG(st.st_mode)
+            return entry.is_file(follow_symlinks=False)
         elif expected_type == stat.S_IFLNK:
-            return stat.S_ISLNK(st.st_mode)
+            return entry.is_symlink()
         else:
             return False  # we cannot process other types, so no valid checks are possible
 
     except OSError:
         return False
-    return True
 
 
-def is_old_format_cfsfile(data: str) -> bool:
+def is_old_format_cfsfile(data: bytes) -> bool:
     """
-    Check if data string has a header of old format (v1 or v2).
+    Check if CFSFile content has a header of old format (v1 or v2).
 
-    :param data: string to check
-    :type data: str
-    :return: True if string has a header of old format, False otherwise
+    :param data: content to check
+    :type data: bytes
+    :return: True if content has a header of old format, False otherwise
     :rtype: bool
     """
-    return data.startswith(FORMAT_HEADER_PREFIX_OLD_FORMAT)
+    return data.startswith(FORMAT_HEADER_PREFIX_OLD_FORMAT_BYTES)
 
 
-def find_next_newline_in_string(s: str, start_position: int) -> int:
+def find_next_newline_in_string(s: bytes, start_position: int) -> int:
     """
     Find position of the nearest new line char (two options for this char are supported).
 
-    :param s: string to search in
-    :type s: str
+    :param s: content to search in
+    :type s: bytes
     :param start_position: start position to search from
     :type start_position: int
     :return: position of new line char in string or -1 if not found
     :rtype: int
     """
-    # Avoid 2 find() calls and relocation of string for enumerate() for speed
+    # Two C-level find() calls, the second one is limited by the first found new line
+    newline_pos: int = s.find(FORMAT_NEW_LINE_BYTES, start_position)
+    if newline_pos == -1:
+        return s.find(FORMAT_NEW_LINE_BYTES_2, start_position)
 
-    for i in range(start_position, len(s)):
-        if s[i] == FORMAT_NEW_LINE_CHAR or s[i] == FORMAT_NEW_LINE_CHAR_2:
-            return i
+    newline_2_pos: int = s.find(FORMAT_NEW_LINE_BYTES_2, start_position, newline_pos)
+    if newline_2_pos == -1:
+        return newline_pos
 
-    return -1
+    return newline_2_pos
 
 
-def cfsfile_get_next_option_pair(data: str, start_position: int) -> (int, str, str):
+def cfsfile_get_next_option_pair(data: bytes, start_position: int) -> (int, str, bytes):
     """
-    Get option=value pair from the data string.
+    Get option=value pair from the CFSFile content.
+    Option name is decoded to string, value is left as bytes.
 
-    :param data: string to parse and get pair from
-    :type data: str
+    :param data: content to parse and get pair from
+    :type data: bytes
     :param start_position: position to start from
     :type start_position: int
     :raises RuntimeError: Invalid string in CatalogFS file
     :return: (new position to use for further parsing, option, value)
-    :rtype: (int, str, str)
+    :rtype: (int, str, bytes)
     """
     if start_position >= len(data):
-        return (-1, '', '')
+        return (-1, '', b'')
 
     current_pos: int = start_position
 
@@ -329,18 +451,19 @@ def cfsfile_get_next_option_pair(data: str, start_position: int) -> (int, str, s
             line_end = len(data)
 
         param_end: int = data.find(
-            FORMAT_FIELD_DELIMITER, current_pos, line_end)
+            FORMAT_FIELD_DELIMITER_BYTES, current_pos, line_end)
 
         if param_end == -1:
-            if len(data[current_pos:line_end].strip(FORMAT_TRIMMING_CHARS)) > 0:
+            if len(data[current_pos:line_end].strip(FORMAT_TRIMMING_BYTES)) > 0:
                 raise RuntimeError('Invalid string in CatalogFS file')
 
             # Go further, skipping whitespace line.
             current_pos = line_end + FORMAT_NEW_LINE_LENGTH
             continue
 
-        option = data[current_pos:param_end].strip(FORMAT_TRIMMING_CHARS)
-        value_start: int = param_end + len(FORMAT_FIELD_DELIMITER)
+        option = data[current_pos:param_end].strip(
+            FORMAT_TRIMMING_BYTES).decode('utf-8', errors='strict')
+        value_start: int = param_end + len(FORMAT_FIELD_DELIMITER_BYTES)
 
         value = data[value_start:line_end]
 
@@ -350,35 +473,40 @@ def cfsfile_get_next_option_pair(data: str, start_position: int) -> (int, str, s
         return (current_pos, option, value)
 
     # No non-whitespace line found
-    return (-1, '', '')
+    return (-1, '', b'')
 
 
-def cfsfile_extract_int(field_value_str: str) -> int:
+def cfsfile_extract_int(field_value_str: bytes) -> int:
     """
-    Extract integer from value string.
+    Extract integer from value bytes.
 
     :param field_value_str: field to extract from
-    :type field_value_str: str
+    :type field_value_str: bytes
     :raises RuntimeError: Invalid field value, not an integer
-    :return: integer value of the string
+    :return: integer value of the field
     :rtype: int
     """
+    # Usual value is just digits, so it's converted without any exception handling
+    if field_value_str.isdigit():
+        return int(field_value_str)
+
+    # int() ignores surrounding whitespace itself (all FORMAT_TRIMMING_BYTES included),
+    # so there is no need to make a stripped copy of the value
     try:
-        field_value_int: int = int(
-            field_value_str.strip(FORMAT_TRIMMING_CHARS))
-    except:
+        field_value_int: int = int(field_value_str)
+    except ValueError:
         raise RuntimeError(
-            f'Invalid field value, not an integer: {field_value_str}')
+            f'Invalid field value, not an integer: {field_value_str.decode("utf-8", errors="replace")}')
 
     return field_value_int
 
 
-def fill_cfsfile_from_string(data: str, cfs_file: CFSFile) -> None:
+def fill_cfsfile_from_string(data: bytes, cfs_file: CFSFile) -> None:
     """
-    Fill CFSFile class from a string with CFSFile content
+    Fill CFSFile class from CFSFile content
 
-    :param data: string with CFSFile content to parse
-    :type data: str
+    :param data: CFSFile content to parse
+    :type data: bytes
     :param cfs_file: CFSFile to fill
     :type cfs_file: CFSFile
     :raises RuntimeError: CatalogFS file expected but no valid header found
@@ -388,6 +516,10 @@ def fill_cfsfile_from_string(data: str, cfs_file: CFSFile) -> None:
     """
     current_pos: int = 0
 
+    # Fast path for the header exactly as it's written by this script
+    if data.startswith(FORMAT_HEADER_TO_WRITE_BYTES):
+        return fill_cfsfile_body_from_string(data, len(FORMAT_HEADER_TO_WRITE_BYTES), cfs_file)
+
     # Check header (first option-value pair)
     (body_start, header_name, version_str) = cfsfile_get_next_option_pair(
         data, current_pos)
@@ -397,17 +529,30 @@ def fill_cfsfile_from_string(data: str, cfs_file: CFSFile) -> None:
 
     try:
         version_int: int = int(version_str)
-    except:
+    except ValueError:
         raise RuntimeError(
-            f'CatalogFS file has invalid version string: "{version_str}"')
+            f'CatalogFS file has invalid version string: "{version_str.decode("utf-8", errors="replace")}"')
 
     if version_int != CFSFILE_VERSION_3:
         raise RuntimeError(
             f'CatalogFS file has unsupported version (file version: "{version_int}")')
 
-    # Other option-value pairs
+    return fill_cfsfile_body_from_string(data, body_start, cfs_file)
 
-    current_pos = body_start
+
+def fill_cfsfile_body_from_string(data: bytes, body_start: int, cfs_file: CFSFile) -> None:
+    """
+    Fill CFSFile class from CFSFile content after the header
+
+    :param data: CFSFile content to parse
+    :type data: bytes
+    :param body_start: position right after the header
+    :type body_start: int
+    :param cfs_file: CFSFile to fill
+    :type cfs_file: CFSFile
+    :raises RuntimeError: Unknown param name in CatalogFS file
+    """
+    current_pos: int = body_start
 
     while True:
 
@@ -422,34 +567,15 @@ def fill_cfsfile_from_string(data: str, cfs_file: CFSFile) -> None:
 
         param: str = option
 
-        if param == 'size':
-            cfs_file.size = cfsfile_extract_int(value)
-        elif param == 'blocks':
-            cfs_file.blocks = cfsfile_extract_int(value)
-        elif param == 'mode':
-            cfs_file.mode = cfsfile_extract_int(value)
-        elif param == 'uid':
-            cfs_file.uid = cfsfile_extract_int(value)
-        elif param == 'gid':
-            cfs_file.gid = cfsfile_extract_int(value)
-        elif param == 'atime':
-            cfs_file.atime = cfsfile_extract_int(value)
-        elif param == 'mtime':
-            cfs_file.mtime = cfsfile_extract_int(value)
-        elif param == 'ctime':
-            cfs_file.ctime = cfsfile_extract_int(value)
-        elif param == 'atimensec':
-            cfs_file.atimensec = cfsfile_extract_int(value)
-        elif param == 'mtimensec':
-            cfs_file.mtimensec = cfsfile_extract_int(value)
-        elif param == 'ctimensec':
-            cfs_file.ctimensec = cfsfile_extract_int(value)
-        elif param == 'nlink':
-            cfs_file.nlink = cfsfile_extract_int(value)
-        elif param == 'blksize':
-            cfs_file.blksize = cfsfile_extract_int(value)
+        # Single set lookup instead of comparing with every field name
+        if param in FORMAT_INT_FIELDS:
+            setattr(cfs_file, param, cfsfile_extract_int(value))
         elif param == 'sha256':
-            cfs_file.sha256 = value.strip(FORMAT_TRIMMING_CHARS)
+            cfs_file.sha256 = value.strip(
+                FORMAT_TRIMMING_BYTES).decode('utf-8', errors='strict')
+        elif param == 'blake3':
+            cfs_file.blake3 = value.strip(
+                FORMAT_TRIMMING_BYTES).decode('utf-8', errors='strict')
         else:
             raise RuntimeError('Unknown param name in CatalogFS file')
 
@@ -481,7 +607,7 @@ def old_format_extract_next_int(data: str, start_position: int) -> (int, int):
 
     try:
         field_value_int: int = int(field_value_str)
-    except:
+    except ValueError:
         raise RuntimeError(
             f'Invalid field value, not an integer: {field_value_str}')
 
@@ -587,45 +713,10 @@ def old_format_fill_cfsfile_body_from_string(data: str, version: int, cfs_file:
         value_start: int = param_end + len(field_sep)
 
         new_pos: int = 0
-        if param == 'size':
-            new_pos, cfs_file.size = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'blocks':
-            new_pos, cfs_file.blocks = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'mode':
-            new_pos, cfs_file.mode = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'uid':
-            new_pos, cfs_file.uid = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'gid':
-            new_pos, cfs_file.gid = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'atime':
-            new_pos, cfs_file.atime = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'mtime':
-            new_pos, cfs_file.mtime = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'ctime':
-            new_pos, cfs_file.ctime = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'atimensec':
-            new_pos, cfs_file.atimensec = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'mtimensec':
-            new_pos, cfs_file.mtimensec = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'ctimensec':
-            new_pos, cfs_file.ctimensec = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'nlink':
-            new_pos, cfs_file.nlink = old_format_extract_next_int(
-                data, value_start)
-        elif param == 'blksize':
-            new_pos, cfs_file.blksize = old_format_extract_next_int(
+        if param in FORMAT_INT_FIELDS:
+            new_pos, field_value_int = old_format_extract_next_int(
                 data, value_start)
+            setattr(cfs_file, param, field_value_int)
         elif param == 'sha256':
             new_pos, cfs_file.sha256 = old_format_extract_next_string(
                 data, value_start)
@@ -670,7 +761,7 @@ def old_format_fill_cfsfile_from_string(data: str, cfs_file: CFSFile) -> None:
     version_str: str = header[len(FORMAT_HEADER_PREFIX_OLD_FORMAT):]
     try:
         version_int: int = int(version_str)
-    except:
+    except ValueError:
         raise RuntimeError(
             f'CatalogFS file has invalid version string: "{version_str}"')
 
@@ -683,30 +774,153 @@ def old_format_fill_cfsfile_from_string(data: str, cfs_file: CFSFile) -> None:
     return old_format_fill_cfsfile_body_from_string(body_data, version_int, cfs_file)
 
 
-def read_cfsfile(filepath: Path, cfs_file: CFSFile) -> None:
+def read_cfsfile(filepath: str, cfs_file: CFSFile) -> None:
     """
     Read CFSFile from the file's content. 
     Supports different file format versions.
 
     :param filepath: file to read from
-    :type filepath: Path
+    :type filepath: str
     :param cfs_file: CFSFile to save the result to
     :type cfs_file: CFSFile
     """
-    data: str = filepath.read_text(encoding='utf-8', errors='strict')
+    # Current format is parsed as bytes without decoding the whole content
+    with open(filepath, 'rb') as f:
+        data: bytes = f.read()
 
     # Check for older versions of format (v1 and v2)
     if is_old_format_cfsfile(data):
-        old_format_fill_cfsfile_from_string(data, cfs_file)
+        # Old formats were read as text, so CRLF and CR line endings have to be translated to '\n' like in text mode
+        text: str = data.decode('utf-8', errors='strict').replace('\r\n', '\n').replace('\r', '\n')
+        old_format_fill_cfsfile_from_string(text, cfs_file)
     else:
         fill_cfsfile_from_string(data, cfs_file)
 
 
+def format_cfsfile_full(cfs_file: CFSFile) -> bytearray:
+    """
+    Format all fields of CFSFile to the content of the output file.
+
+    :param cfs_file: CFSFile data to format
+    :type cfs_file: CFSFile
+    :return: content of the output file
+    :rtype: bytearray
+    """
+    # Content is built in a single bytearray from precomputed templates,
+    # bytes formatting of integers needs no encoding and no intermediate strings
+    data: bytearray = bytearray(FORMAT_HEADER_TO_WRITE_BYTES)
+
+    if cfs_file.size is not None:
+        data += FORMAT_FIELD_TEMPLATE_SIZE % cfs_file.size
+
+    if cfs_file.blocks is not None:
+        data += FORMAT_FIELD_TEMPLATE_BLOCKS % cfs_file.blocks
+    if cfs_file.mode is not None:
+        data += FORMAT_FIELD_TEMPLATE_MODE % cfs_file.mode
+    if cfs_file.uid is not None:
+        data += FORMAT_FIELD_TEMPLATE_UID % cfs_file.uid
+    if cfs_file.gid is not None:
+        data += FORMAT_FIELD_TEMPLATE_GID % cfs_file.gid
+    if cfs_file.atime is not None:
+        data += FORMAT_FIELD_TEMPLATE_ATIME % cfs_file.atime
+    if cfs_file.mtime is not None:
+        data += FORMAT_FIELD_TEMPLATE_MTIME % cfs_file.mtime
+    if cfs_file.ctime is not None:
+        data += FORMAT_FIELD_TEMPLATE_CTIME % cfs_file.ctime
+    # Nanoseconds are written only if they are known and non-zero (single truth test for both)
+    if cfs_file.atimensec:
+        data += FORMAT_FIELD_TEMPLATE_ATIMENSEC % cfs_file.atimensec
+    if cfs_file.mtimensec:
+        data += FORMAT_FIELD_TEMPLATE_MTIMENSEC % cfs_file.mtimensec
+    if cfs_file.ctimensec:
+        data += FORMAT_FIELD_TEMPLATE_CTIMENSEC % cfs_file.ctimensec
+    if cfs_file.nlink is not None:
+        data += FORMAT_FIELD_TEMPLATE_NLINK % cfs_file.nlink
+    if cfs_file.blksize is not None:
+        data += FORMAT_FIELD_TEMPLATE_BLKSIZE % cfs_file.blksize
+
+    if cfs_file.sha256 is not None:
+        data += FORMAT_FIELD_TEMPLATE_SHA256 % cfs_file.sha256.encode('utf-8')
+    if cfs_file.blake3 is not None:
+        data += FORMAT_FIELD_TEMPLATE_BLAKE3 % cfs_file.blake3.encode('utf-8')
+
+    return data
+
+
+def format_cfsfile_data_only(cfs_file: CFSFile) -> bytearray:
+    """
+    Format only fields of CFSFile that describe data content (size, checksum) to the content of the output file.
+
+    :param cfs_file: CFSFile data to format
+    :type cfs_file: CFSFile
+    :return: content of the output file
+    :rtype: bytearray
+    """
+    data: bytearray = bytearray(FORMAT_HEADER_TO_WRITE_BYTES)
+
+    if cfs_file.size is not None:
+        data += FORMAT_FIELD_TEMPLATE_SIZE % cfs_file.size
+
+    if cfs_file.sha256 is not None:
+        data += FORMAT_FIELD_TEMPLATE_SHA256 % cfs_file.sha256.encode('utf-8')
+    if cfs_file.blake3 is not None:
+        data += FORMAT_FIELD_TEMPLATE_BLAKE3 % cfs_file.blake3.encode('utf-8')
+
+    return data
+
+
+def format_cfsfile_data_and_time_only(cfs_file: CFSFile) -> bytearray:
+    """
+    Format only fields of CFSFile that describe data content and modification time to the content of the output file.
+
+    :param cfs_file: CFSFile data to format
+    :type cfs_file: CFSFile
+    :return: content of the output file
+    :rtype: bytearray
+    """
+    data: bytearray = bytearray(FORMAT_HEADER_TO_WRITE_BYTES)
+
+    if cfs_file.size is not None:
+        data += FORMAT_FIELD_TEMPLATE_SIZE % cfs_file.size
+
+    if cfs_file.mtime is not None:
+        data += FORMAT_FIELD_TEMPLATE_MTIME % cfs_file.mtime
+    if cfs_file.mtimensec:
+        data += FORMAT_FIELD_TEMPLATE_MTIMENSEC % cfs_file.mtimensec
+
+    if cfs_file.sha256 is not None:
+        data += FORMAT_FIELD_TEMPLATE_SHA256 % cfs_file.sha256.encode('utf-8')
+    if cfs_file.blake3 is not None:
+        data += FORMAT_FIELD_TEMPLATE_BLAKE3 % cfs_file.blake3.encode('utf-8')
+
+    return data
+
+
+def get_cfsfile_formatter(flag_data_only: bool, flag_data_and_time_only: bool) -> Callable[[CFSFile], bytearray]:
+    """
+    Choose the function for formatting CFSFile content according to the set of fields to store.
+    The choice is made once per run, so there are no checks of flags for every file.
+
+    :param flag_data_only: store only fields that describe data content (size, checksum)
+    :type flag_data_only: bool
+    :param flag_data_and_time_only: store only fields that describe data content and modification time
+    :type flag_data_and_time_only: bool
+    :return: function that formats CFSFile to the content of the output file
+    :rtype: Callable[[CFSFile], bytearray]
+    """
+    if flag_data_only:
+        return format_cfsfile_data_only
+    elif flag_data_and_time_only:
+        return format_cfsfile_data_and_time_only
+    else:
+        return format_cfsfile_full
+
+
 def write_cfsfile(source_st: os.stat_result,
                   cfs_file: CFSFile,
-                  output_cfsfile_file: Path,
-                  flag_data_only: bool,
-                  flag_data_and_time_only: bool) -> bool:
+                  output_cfsfile_file: str,
+                  cfsfile_formatter: Callable[[CFSFile], bytearray],
+                  output_dir_fd: int = None) -> bool:
     """
     Write CFSFile information to the output file and use os.stat_result for output file's actual stat
     Supports custom sets of fields in the output file - size-only and data-and-time-only
@@ -716,69 +930,52 @@ def write_cfsfile(source_st: os.stat_result,
     :param cfs_file: CFSFile data to store in the output file's content
     :type cfs_file: CFSFile
     :param output_cfsfile_file: path of file to save CFSFile information to
-    :type output_cfsfile_file: Path
-    :param flag_data_only: save to the output file only fields that describe data content (size, checksum)
-    :type flag_data_only: bool
-    :param flag_data_and_time_only: save to the output file only fields that describe data content and modification time
-    :type flag_data_and_time_only: bool
+    :type output_cfsfile_file: str
+    :param cfsfile_formatter: function that formats CFSFile to the content of the output file (see get_cfsfile_formatter)
+    :type cfsfile_formatter: Callable[[CFSFile], bytearray]
+    :param output_dir_fd: descriptor of the output directory to create output file in, defaults to None (path is used)
+    :type output_dir_fd: int, optional
     :return: True on success, False on error
     :rtype: bool
     """
-    data: str = ''
-
-    if flag_data_only:
-        data = (FORMAT_HEADER_TO_WRITE +
-                (f"size{FORMAT_FIELD_DELIMITER}{cfs_file.size}{FORMAT_NEW_LINE_CHAR}" if cfs_file.size is not None else '') +
-                (f"sha256{FORMAT_FIELD_DELIMITER}{cfs_file.sha256}{FORMAT_NEW_LINE_CHAR}" if cfs_file.sha256 is not None else ''))
-    elif flag_data_and_time_only:
-        data = (FORMAT_HEADER_TO_WRITE +
-                (f"size{FORMAT_FIELD_DELIMITER}{cfs_file.size}{FORMAT_NEW_LINE_CHAR}" if cfs_file.size is not None else '') +
-                (f"mtime{FORMAT_FIELD_DELIMITER}{int(cfs_file.mtime)}{FORMAT_NEW_LINE_CHAR}" if cfs_file.mtime is not None else '') +
-                (f"mtimensec{FORMAT_FIELD_DELIMITER}{cfs_file.mtimensec}{FORMAT_NEW_LINE_CHAR}" if cfs_file.mtimensec is not None and cfs_file.mtimensec != 0 else '') +
-                (f"sha256{FORMAT_FIELD_DELIMITER}{cfs_file.sha256}{FORMAT_NEW_LINE_CHAR}" if cfs_file.sha256 is not None else ''))
-    else:
-        data = (FORMAT_HEADER_TO_WRITE +
-                (f"size{FORMAT_FIELD_DELIMITER}{cfs_file.size}{FORMAT_NEW_LINE_CHAR}" if cfs_file.size is not None else '') +
-                (f"blocks{FORMAT_FIELD_DELIMITER}{cfs_file.blocks}{FORMAT_NEW_LINE_CHAR}" if cfs_file.blocks is not None else '') +
-                (f"mode{FORMAT_FIELD_DELIMITER}{cfs_file.mode}{FORMAT_NEW_LINE_CHAR}" if cfs_file.mode is not None else '') +
-                (f"uid{FORMAT_FIELD_DELIMITER}{cfs_file.uid}{FORMAT_NEW_LINE_CHAR}" if cfs_file.uid is not None else '') +
-                (f"gid{FORMAT_FIELD_DELIMITER}{cfs_file.gid}{FORMAT_NEW_LINE_CHAR}" if cfs_file.gid is not None else '') +
-                (f"atime{FORMAT_FIELD_DELIMITER}{int(cfs_file.atime)}{FORMAT_NEW_LINE_CHAR}" if cfs_file.atime is not None else '') +
-                (f"mtime{FORMAT_FIELD_DELIMITER}{int(cfs_file.mtime)}{FORMAT_NEW_LINE_CHAR}" if cfs_file.mtime is not None else '') +
-                (f"ctime{FORMAT_FIELD_DELIMITER}{int(cfs_file.ctime)}{FORMAT_NEW_LINE_CHAR}" if cfs_file.ctime is not None else '') +
-                (f"atimensec{FORMAT_FIELD_DELIMITER}{cfs_file.atimensec}{FORMAT_NEW_LINE_CHAR}" if cfs_file.atimensec is not None and cfs_file.atimensec != 0 else '') +
-                (f"mtimensec{FORMAT_FIELD_DELIMITER}{cfs_file.mtimensec}{FORMAT_NEW_LINE_CHAR}" if cfs_file.mtimensec is not None and cfs_file.mtimensec != 0 else '') +
-                (f"ctimensec{FORMAT_FIELD_DELIMITER}{cfs_file.ctimensec}{FORMAT_NEW_LINE_CHAR}" if cfs_file.ctimensec is not None and cfs_file.ctimensec != 0 else '') +
-                (f"nlink{FORMAT_FIELD_DELIMITER}{cfs_file.nlink}{FORMAT_NEW_LINE_CHAR}" if cfs_file.nlink is not None else '') +
-                (f"blksize{FORMAT_FIELD_DELIMITER}{cfs_file.blksize}{FORMAT_NEW_LINE_CHAR}" if cfs_file.blksize is not None else '') +
-                (f"sha256{FORMAT_FIELD_DELIMITER}{cfs_file.sha256}{FORMAT_NEW_LINE_CHAR}" if cfs_file.sha256 is not None else ''))
-
-    output_cfsfile_file.write_text(data, encoding='utf-8', errors='strict')
-
-    # Try to set mode if possible (not important)
+    data: bytearray = cfsfile_formatter(cfs_file)
+
+    # Write bytes directly, without text-mode file object,
+    # and set stat of the output file using the same descriptor (no more lookups of its path)
+    # O_EXCL: existing file is never overwritten even if it appeared after the check in process_one_file
+    fd: int = os.open(path_for_dir_fd(output_cfsfile_file, output_dir_fd),
+                      os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666,
+                      dir_fd=output_dir_fd)
     try:
-        os.chmod(output_cfsfile_file, source_st.st_mode)
-    except:
-        print_error(
-            f'Failed to chmod file: {correct_utf8_pathstring(output_cfsfile_file)}')
+        while data:
+            data = data[os.write(fd, data):]
 
-    # Try to set uid/gid if possible (not important)
-    try:
-        os.chown(output_cfsfile_file, source_st.st_uid, source_st.st_gid)
-    except:
-        print_error(
-            f'Failed to chown file: {correct_utf8_pathstring(output_cfsfile_file)}')
+        # Try to set mode if possible (not important)
+        try:
+            os.fchmod(fd, source_st.st_mode)
+        except:
+            print_error(
+                f'Failed to chmod file: {correct_utf8_pathstring(output_cfsfile_file)}')
 
-    # Try to set atime and mtime if possible (not important)
-    # ctime cannot be set using python as far as I know
-    try:
-        os.utime(output_cfsfile_file, (source_st.st_atime, source_st.st_mtime))
-    except:
-        print_error(
-            f'Failed to set utime for file: {correct_utf8_pathstring(output_cfsfile_file)}')
+        # Try to set uid/gid if possible (not important)
+        try:
+            os.fchown(fd, source_st.st_uid, source_st.st_gid)
+        except:
+            print_error(
+                f'Failed to chown file: {correct_utf8_pathstring(output_cfsfile_file)}')
 
-    print_ok(
-        f'File was listed: {correct_utf8_pathstring(output_cfsfile_file)}')
+        # Try to set atime and mtime if possible (not important)
+        # ctime cannot be set using python as far as I know
+        # Nanoseconds are used to keep the exact times (float seconds lose precision)
+        try:
+            os.utime(fd, ns=(source_st.st_atime_ns, source_st.st_mtime_ns))
+        except:
+            print_error(
+                f'Failed to set utime for file: {correct_utf8_pathstring(output_cfsfile_file)}')
+    finally:
+        os.close(fd)
+
+    print_ok('File was listed', output_cfsfile_file)
 
     return True
 
@@ -799,72 +996,174 @@ def create_cfsfile_from_regularfile(st: os.stat_result) -> CFSFile:
     cfs_file.mode = st.st_mode
     cfs_file.uid = st.st_uid
     cfs_file.gid = st.st_gid
-    cfs_file.atime = st.st_atime
-    cfs_file.mtime = st.st_mtime
-    cfs_file.ctime = st.st_ctime
-    cfs_file.atimensec = st.st_atime_ns % 1000000000
-    cfs_file.mtimensec = st.st_mtime_ns % 1000000000
-    cfs_file.ctimensec = st.st_ctime_ns % 1000000000
+    cfs_file.atime, cfs_file.atimensec = divmod(st.st_atime_ns, NS_PER_SEC)
+    cfs_file.mtime, cfs_file.mtimensec = divmod(st.st_mtime_ns, NS_PER_SEC)
+    cfs_file.ctime, cfs_file.ctimensec = divmod(st.st_ctime_ns, NS_PER_SEC)
     cfs_file.nlink = st.st_nlink
     cfs_file.blksize = st.st_blksize
     # not filling:
     cfs_file.sha256: str = None
+    cfs_file.blake3: str = None
+
+    return cfs_file
+
+
+def create_cfsfile_data_only_from_regularfile(st: os.stat_result) -> CFSFile:
+    """
+    Create CFSFile with only stat values that describe data content (size) from the regular file's os.stat_result.
+    Other fields are left as None because they are not stored (see format_cfsfile_data_only).
+
+    :param st: stat to take values from
+    :type st: os.stat_result
+    :return: new CFSFile filled with values from os.stat_result
+    :rtype: CFSFile
+    """
+    cfs_file: CFSFile = CFSFile()
+
+    cfs_file.size = st.st_size
 
     return cfs_file
 
 
-def copy_symlink(source_file: Path, output_file: Path) -> bool:
+def create_cfsfile_data_and_time_only_from_regularfile(st: os.stat_result) -> CFSFile:
+    """
+    Create CFSFile with only stat values that describe data content and modification time from the regular file's os.stat_result.
+    Other fields are left as None because they are not stored (see format_cfsfile_data_and_time_only).
+
+    :param st: stat to take values from
+    :type st: os.stat_result
+    :return: new CFSFile filled with values from os.stat_result
+    :rtype: CFSFile
+    """
+    cfs_file: CFSFile = CFSFile()
+
+    cfs_file.size = st.st_size
+    cfs_file.mtime, cfs_file.mtimensec = divmod(st.st_mtime_ns, NS_PER_SEC)
+
+    return cfs_file
+
+
+def get_cfsfile_creator(flag_data_only: bool, flag_data_and_time_only: bool) -> Callable[[os.stat_result], CFSFile]:
+    """
+    Choose the function for creating CFSFile from the regular file's stat according to the set of fields to store.
+    The choice is made once per run like for get_cfsfile_formatter, so fields that are not stored are not filled at all.
+
+    :param flag_data_only: store only fields that describe data content (size, checksum)
+    :type flag_data_only: bool
+    :param flag_data_and_time_only: store only fields that describe data content and modification time
+    :type flag_data_and_time_only: bool
+    :return: function that creates CFSFile from os.stat_result
+    :rtype: Callable[[os.stat_result], CFSFile]
+    """
+    if flag_data_only:
+        return create_cfsfile_data_only_from_regularfile
+    elif flag_data_and_time_only:
+        return create_cfsfile_data_and_time_only_from_regularfile
+    else:
+        return create_cfsfile_from_regularfile
+
+
+def copy_symlink(source_file: str, output_file: str) -> bool:
     """
     Copy symlink directly (not following other symlinks)
 
     :param source_file: source symlink file path
-    :type source_file: Path
+    :type source_file: str
     :param output_file: target symlink file path
-    :type output_file: Path
+    :type output_file: str
     :return: always True (currently) or throws on error
     :rtype: bool
     """
+    import shutil
+
     shutil.copy2(source_file, output_file, follow_symlinks=False)
 
-    print_ok(f'Symlink was copied: {correct_utf8_pathstring(output_file)}')
+    print_ok('Symlink was copied', output_file)
 
     return True
 
 
-def create_directory(source_directory: Path, output_directory: Path, skip_existing: bool) -> bool:
+def check_existing_output(output_path: str,
+                          output_dir_fd: int,
+                          skip_existing: bool,
+                          flag_directory: bool,
+                          output_st: os.stat_result = None) -> bool:
+    """
+    Check if output file or directory already exists and report about it.
+    Output is checked by a single lstat, an error means that there is nothing with the same name.
+
+    :param output_path: path of output file or directory
+    :type output_path: str
+    :param output_dir_fd: descriptor of the directory containing output, None if path should be used
+    :type output_dir_fd: int
+    :param skip_existing: if True then it's OK for output to exist, otherwise it's an error
+    :type skip_existing: bool
+    :param flag_directory: output is a directory, otherwise it's a file (regular one or symlink)
+    :type flag_directory: bool
+    :param output_st: lstat of output if it's already known to exist, defaults to None (lstat is called)
+    :type output_st: os.stat_result, optional
+    :return: None if output does not exist, True if existing output can be skipped, False on error
+    :rtype: bool
+    """
+    if output_st is None:
+        try:
+            output_st = os.lstat(path_for_dir_fd(output_path, output_dir_fd), dir_fd=output_dir_fd)
+        except OSError:
+            return None
+
+    kind: str = 'directory' if flag_directory else 'file'
+    if flag_directory:
+        is_same_type: bool = stat.S_ISDIR(output_st.st_mode)
+    else:
+        is_same_type: bool = stat.S_ISREG(output_st.st_mode) or stat.S_ISLNK(output_st.st_mode)
+
+    if is_same_type:
+        if skip_existing:
+            print_ok(f'Output {kind} already exists, skipping it', output_path)
+            return True
+        else:
+            print_error(
+                f'Output {kind} already exists and will not be modified: {correct_utf8_pathstring(output_path)}')
+            return False  # Do nothing to prevent any modification of existing files and directories
+    else:
+        print_error(
+            f'Cannot create output {kind} because something already has the same name: {correct_utf8_pathstring(output_path)}')
+        return False
+
+
+def create_directory(source_directory: str,
+                     output_directory: str,
+                     skip_existing: bool,
+                     st: os.stat_result = None,
+                     output_dir_fd: int = None) -> bool:
     """
     Create an output directory using path of source directory.
     Checks if source directory is a symlink and also creates symlink in that case.
     Output directory has mode 0o777.
+    Existence of output directory is checked only if mkdir fails, because usually it does not exist.
 
     :param source_directory: path of source directory or symlink
-    :type source_directory: Path
+    :type source_directory: str
     :param output_directory: path of output directory to create
-    :type output_directory: Path
+    :type output_directory: str
     :param skip_existing: if True then it's OK for output directory to exists, otherwise it's an error
     :type skip_existing: bool
+    :param st: lstat of source directory if it's already known, defaults to None
+    :type st: os.stat_result, optional
+    :param output_dir_fd: descriptor of the output directory to create output directory in, defaults to None (path is used)
+    :type output_dir_fd: int, optional
     :return: True on success, False on error
     :rtype: bool
     """
-    if does_exist(output_directory, stat.S_IFDIR):
-        if skip_existing:
-            print_ok(
-                f'Output directory already exists, skipping it: {correct_utf8_pathstring(output_directory)}')
-            return True
-        else:
-            print_error(
-                f'Output directory already exists and will not be modified: {correct_utf8_pathstring(output_directory)}')
-            return False  # Do nothing to prevent any modification of existing directories
-    elif does_exist(output_directory, 0):
-        print_error(
-            f'Cannot create output directory because something already has the same name: {correct_utf8_pathstring(output_directory)}')
-        return False
-
-    st: os.stat_result = os.lstat(source_directory)
+    if st is None:
+        st = os.lstat(source_directory)
 
     if stat.S_ISLNK(st.st_mode):
-        print_ok(
-            f'Directory is a symlink: {correct_utf8_pathstring(source_directory)}')
+        existing: bool = check_existing_output(output_directory, output_dir_fd, skip_existing, flag_directory=True)
+        if existing is not None:
+            return existing
+
+        print_ok('Directory is a symlink', source_directory)
         return copy_symlink(source_directory, output_directory)
 
     if not stat.S_ISDIR(st.st_mode):
@@ -872,30 +1171,34 @@ def create_directory(source_directory: Path, output_directory: Path, skip_existi
             f'Internal error. Source directory is not a directory: {correct_utf8_pathstring(source_directory)}')
         return False
 
-    output_directory.mkdir(mode=0o777, parents=False, exist_ok=False)
+    try:
+        os.mkdir(path_for_dir_fd(output_directory, output_dir_fd), 0o777, dir_fd=output_dir_fd)
+    except FileExistsError:
+        return check_existing_output(output_directory, output_dir_fd, skip_existing, flag_directory=True) is True
 
-    print_ok(
-        f'Directory was created: {correct_utf8_pathstring(output_directory)}')
+    print_ok('Directory was created', output_directory)
 
     return True
 
 
-def update_directory(source_directory: Path, output_directory: Path) -> bool:
+def update_directory(source_directory: str, output_directory: str, st: os.stat_result = None) -> bool:
     """
     Update chmod, chown and utime of output directory based on source one
 
     :param source_directory: path of directory to take values from
-    :type source_directory: Path
+    :type source_directory: str
     :param output_directory: path of target directory to set values to
-    :type output_directory: Path
+    :type output_directory: str
+    :param st: lstat of source directory if it's already known, defaults to None
+    :type st: os.stat_result, optional
     :return: True on success, False on error
     :rtype: bool
     """
-    st: os.stat_result = os.lstat(source_directory)
+    if st is None:
+        st = os.lstat(source_directory)
 
     if stat.S_ISLNK(st.st_mode):
-        print_ok(
-            f'Skipping update for the directory as it is a symlink: {correct_utf8_pathstring(source_directory)}')
+        print_ok('Skipping update for the directory as it is a symlink', source_directory)
         return True
 
     if not stat.S_ISDIR(st.st_mode):
@@ -920,295 +1223,652 @@ def update_directory(source_directory: Path, output_directory: Path) -> bool:
     # Try to set atime and mtime if possible (not important)
     # ctime can not be set by python as far as I know
     try:
-        os.utime(output_directory, (st.st_atime, st.st_mtime))
+        os.utime(output_directory, ns=(st.st_atime_ns, st.st_mtime_ns))
     except:
         print_error(
             f'Failed to set utime for directory: {correct_utf8_pathstring(output_directory)}')
 
-    print_ok(
-        f'Directory was updated: {correct_utf8_pathstring(output_directory)}')
+    print_ok('Directory was updated', output_directory)
 
     return True
 
 
-def process_one_file(source_file: Path,
-                     output_cfsfile_file: Path,
+def process_one_file(source_file: str,
+                     output_cfsfile_file: str,
                      skip_existing: bool,
                      flag_source_is_cfsfile: bool,
                      flag_sha256: bool,
-                     flag_data_only: bool,
-                     flag_data_and_time_only: bool) -> bool:
+                     flag_blake3: bool,
+                     cfsfile_formatter: Callable[[CFSFile], bytearray],
+                     cfsfile_creator: Callable[[os.stat_result], CFSFile] = create_cfsfile_from_regularfile,
+                     sha256_str: str = None,
+                     blake3_str: str = None,
+                     st: os.stat_result = None,
+                     output_dir_fd: int = None,
+                     entry: os.DirEntry = None,
+                     is_output_checked: bool = False) -> bool:
     """
     Creates real CFSfile at provided path with stat from source file.
 
     Supports source file to be a CFSfile file already.
     In this case the stat is taken from the source file's content.
 
-    Can optionally calculate SHA256 checksum and save it into the output file.
+    Can optionally calculate SHA256 and BLAKE3 checksums and save them into the output file.
     Supports custom sets of fields in output file - size-only and data-and-time-only
 
+    Existence of output file is checked in advance if checksums are going to be calculated
+    or existing output files are skipped (then most of them usually exist),
+    otherwise only if the output file cannot be created.
+
     :param source_file: path of source file to get stat of or from
-    :type source_file: Path
+    :type source_file: str
     :param output_cfsfile_file: output CFSfile file path
-    :type output_cfsfile_file: Path
+    :type output_cfsfile_file: str
     :param skip_existing: if True and output file exists it will be skipped without error
     :type skip_existing: bool
     :param flag_source_is_cfsfile: source file is a CFSfile, read stat from its content
     :type flag_source_is_cfsfile: bool
     :param flag_sha256: calculate and save SHA256 checksum of source file to the output file
     :type flag_sha256: bool
-    :param flag_data_only: save to the output file only fields that describe data content (size, checksum)
-    :type flag_data_only: bool
-    :param flag_data_and_time_only: save to the output file only fields that describe data content and modification time
-    :type flag_data_and_time_only: bool
+    :param flag_blake3: calculate and save BLAKE3 checksum of source file to the output file
+    :type flag_blake3: bool
+    :param cfsfile_formatter: function that formats CFSFile to the content of the output file (see get_cfsfile_formatter)
+    :type cfsfile_formatter: Callable[[CFSFile], bytearray]
+    :param cfsfile_creator: function that creates CFSFile from the source file's stat (see get_cfsfile_creator), defaults to create_cfsfile_from_regularfile
+    :type cfsfile_creator: Callable[[os.stat_result], CFSFile], optional
+    :param sha256_str: SHA256 checksum of source file if it was already calculated, defaults to None
+    :type sha256_str: str, optional
+    :param blake3_str: BLAKE3 checksum of source file if it was already calculated, defaults to None
+    :type blake3_str: str, optional
+    :param st: lstat of source file if it's already known, defaults to None
+    :type st: os.stat_result, optional
+    :param output_dir_fd: descriptor of the output directory to create output file in, defaults to None (path is used)
+    :type output_dir_fd: int, optional
+    :param entry: entry of source file from os.scandir, used to get its type and stat without lstat if possible, defaults to None
+    :type entry: os.DirEntry, optional
+    :param is_output_checked: output file was already checked by the caller and does not exist, defaults to False
+    :type is_output_checked: bool, optional
     :return: True on success, False on error
     :rtype: bool
     """
-    if does_exist(output_cfsfile_file, stat.S_IFREG) or does_exist(output_cfsfile_file, stat.S_IFLNK):
-        if skip_existing:
-            print_ok(
-                f'Output file already exists, skipping it: {correct_utf8_pathstring(output_cfsfile_file)}')
-            return True
-        else:
-            print_error(
-                f'Output file already exists and will not be modified: {correct_utf8_pathstring(output_cfsfile_file)}')
-            return False
-    elif does_exist(output_cfsfile_file, 0):
-        print_error(
-            f'Cannot create output file because something already has the same name: {correct_utf8_pathstring(output_cfsfile_file)}')
-        return False
-
-    st: os.stat_result = os.lstat(source_file)
+    if not is_output_checked and (skip_existing or flag_sha256 or flag_blake3):
+        # Don't waste time on checksums (or on reading source CFSFile) for the output file that will not be created
+        existing: bool = check_existing_output(output_cfsfile_file, output_dir_fd, skip_existing, flag_directory=False)
+        if existing is not None:
+            return existing
+
+    if st is None and entry is not None:
+        # Type is known from reading the directory, so stat is requested only for regular files (and cached by entry)
+        is_regular: bool = entry_matches_type(entry, stat.S_IFREG)
+        is_symlink: bool = not is_regular and entry_matches_type(entry, stat.S_IFLNK)
+        if is_regular:
+            st = entry.stat(follow_symlinks=False)
+    else:
+        if st is None:
+            st = os.lstat(source_file)
+        is_regular: bool = stat.S_ISREG(st.st_mode)
+        is_symlink: bool = stat.S_ISLNK(st.st_mode)
 
-    if not stat.S_ISREG(st.st_mode) and not stat.S_ISLNK(st.st_mode):
+    if not is_regular and not is_symlink:
         print_error(
             f'Source file was skipped as it is not a regular file nor symlink: {correct_utf8_pathstring(source_file)}')
         return False
 
     res: bool = False
 
-    if stat.S_ISREG(st.st_mode):
+    try:
+        if is_regular:
 
-        if flag_source_is_cfsfile:
+            if flag_source_is_cfsfile:
 
-            if st.st_size > FORMAT_MAX_FILE_SIZE:
-                print_error(
-                    f'File is too big ({st.st_size} bytes) to be a valid CatalogFS file: {correct_utf8_pathstring(source_file)}')
-                return False
+                if st.st_size > FORMAT_MAX_FILE_SIZE:
+                    print_error(
+                        f'File is too big ({st.st_size} bytes) to be a valid CatalogFS file: {correct_utf8_pathstring(source_file)}')
+                    return False
 
-            cfs_file: CFSFile = create_cfsfile_from_regularfile(st)
+                cfs_file: CFSFile = create_cfsfile_from_regularfile(st)
 
-            try:
-                read_cfsfile(source_file, cfs_file)
-            except Exception as e:
-                print_error(
-                    f'Failed to read CFSFile, error "{str(e)}" for file: {correct_utf8_pathstring(source_file)}')
-                return False
+                try:
+                    read_cfsfile(source_file, cfs_file)
+                except Exception as e:
+                    print_error(
+                        f'Failed to read CFSFile, error "{str(e)}" for file: {correct_utf8_pathstring(source_file)}')
+                    return False
+
+                res = write_cfsfile(
+                    source_st=st,
+                    cfs_file=cfs_file,
+                    output_cfsfile_file=output_cfsfile_file,
+                    cfsfile_formatter=cfsfile_formatter,
+                    output_dir_fd=output_dir_fd)
+            else:
+                if (flag_sha256 and sha256_str is None) or (flag_blake3 and blake3_str is None):
+                    # Both checksums are calculated in a single pass over the file
+                    sha256_str, blake3_str = checksums_job(source_file, flag_sha256, flag_blake3)
+
+                cfs_file: CFSFile = cfsfile_creator(st)
+                cfs_file.sha256 = sha256_str
+                cfs_file.blake3 = blake3_str
+
+                res = write_cfsfile(
+                    source_st=st,
+                    cfs_file=cfs_file,
+                    output_cfsfile_file=output_cfsfile_file,
+                    cfsfile_formatter=cfsfile_formatter,
+                    output_dir_fd=output_dir_fd)
+
+        elif is_symlink:
+            res = copy_symlink(source_file, output_cfsfile_file)
 
-            res = write_cfsfile(
-                source_st=st,
-                cfs_file=cfs_file,
-                output_cfsfile_file=output_cfsfile_file,
-                flag_data_only=flag_data_only,
-                flag_data_and_time_only=flag_data_and_time_only)
         else:
-            sha256_str: str = sha256_wrapper(source_file, flag_sha256)
+            print_error(
+                f'Internal error. File is not a regular file nor symlink: {correct_utf8_pathstring(source_file)}')
+            return False  # should never happen
 
-            cfs_file: CFSFile = create_cfsfile_from_regularfile(st)
-            cfs_file.sha256 = sha256_str
+    except FileExistsError:
+        return check_existing_output(output_cfsfile_file, output_dir_fd, skip_existing, flag_directory=False) is True
 
-            res = write_cfsfile(
-                source_st=st,
-                cfs_file=cfs_file,
-                output_cfsfile_file=output_cfsfile_file,
-                flag_data_only=flag_data_only,
-                flag_data_and_time_only=flag_data_and_time_only)
+    return res
 
-    elif stat.S_ISLNK(st.st_mode):
-        res = copy_symlink(source_file, output_cfsfile_file)
 
-    else:
-        print_error(
-            f'Internal error. File is not a regular file nor symlink: {correct_utf8_pathstring(source_file)}')
-        return False  # should never happen
+def file_checksums(filename: str, flag_sha256: bool, flag_blake3: bool, block_size=1048576) -> (str, str):
+    """
+    Calculate SHA256 and BLAKE3 checksums for the file in a single pass (each block read is passed to both hashers).
+    Files smaller than block_size are read by a single call, bigger ones are read by blocks into a preallocated buffer.
+    The file is read and not memory-mapped, so if it shrinks while being hashed,
+    the checksums of what was read are returned instead of the process being killed by SIGBUS.
+    Where available, the kernel is advised to read the file sequentially and to drop it from the page cache
+    after both checksums are calculated.
+    BLAKE3 requires optional blake3 module (its SIMD implementation is much faster than SHA256 on CPUs without SHA extensions).
+
+    :param filename: path of file to calculate the checksums of
+    :type filename: str
+    :param flag_sha256: calculate SHA256 checksum
+    :type flag_sha256: bool
+    :param flag_blake3: calculate BLAKE3 checksum
+    :type flag_blake3: bool
+    :param block_size: block size for reading file, default is 1048576
+    :type block_size: int, optional
+    :return: (SHA256 checksum, BLAKE3 checksum) as strings, each is None if not needed
+    :rtype: (str, str)
+    """
+    hashers: list = []
+    sha256_hasher = None
+    blake3_hasher = None
+    if flag_sha256:
+        import hashlib
+        sha256_hasher = hashlib.sha256()
+        hashers.append(sha256_hasher)
+    if flag_blake3:
+        import blake3
+        blake3_hasher = blake3.blake3()
+        hashers.append(blake3_hasher)
+
+    flag_fadvise: bool = hasattr(os, 'posix_fadvise')
+
+    with open(filename, 'rb', buffering=0) as f:
+        fd: int = f.fileno()
+        size: int = os.fstat(fd).st_size
+
+        if flag_fadvise:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        if size < block_size:
+            # Small file is just read by a single call
+            data: bytes = f.read()
+            for hasher in hashers:
+                hasher.update(data)
+        else:
+            buffer: bytearray = bytearray(block_size)
+            with memoryview(buffer) as view:
+                while True:
+                    read_size: int = f.readinto(buffer)
+                    if not read_size:
+                        break
+                    for hasher in hashers:
+                        hasher.update(view[:read_size])
 
-    return res
+        if flag_fadvise:
+            # Content of the file is not needed anymore, so it should not push other data out of the page cache
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+    return (sha256_hasher.hexdigest() if sha256_hasher is not None else None,
+            blake3_hasher.hexdigest() if blake3_hasher is not None else None)
 
 
-def sha256_checksum(filename: Path, block_size=65536) -> str:
+def prefetch_file(filename: str) -> None:
     """
-    Calculate SHA256 checksum for the file
+    Advise the kernel to start reading the file into the page cache in background (if supported).
+    Used to read the next file from disk while the current one is being hashed.
+    Errors are ignored because it's only an optimization.
 
-    :param filename: path of file to calculate the checksum of
-    :type filename: Path
-    :param block_size: bock size for reading file, default is 65536
-    :type block_size: int, optional
-    :return: SHA256 checksum as a string
-    :rtype: str
+    :param filename: path of file to prefetch
+    :type filename: str
     """
-    hasher = hashlib.sha256()
-    with open(filename, 'rb') as f:
-        while True:
-            data = f.read(block_size)
-            if not data:
-                break
-            hasher.update(data)
+    if not hasattr(os, 'posix_fadvise'):
+        return
 
-        # for block in iter(lambda: f.read(block_size), b''):
-        #     hasher.update(block)
-        return hasher.hexdigest()
+    try:
+        fd: int = os.open(filename, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
 
 
-def sha256_wrapper(filename: Path, flag_sha256: bool) -> str:
+def checksums_job(filename: str, flag_sha256: bool, flag_blake3: bool) -> (str, str):
     """
-    Wrapper for possible calculation of SHA256 checksum for the file (if needed)
+    Calculate checksums for the file (in a worker process or in the calling thread).
+    Only regular files should be provided, other types of files are left for process_one_file.
 
-    :param filename: path of file to calculate the checksum of
-    :type filename: Path
-    :param flag_sha256: is actual checksum calculation needed
+    :param filename: path of file to calculate the checksums of
+    :type filename: str
+    :param flag_sha256: calculate SHA256 checksum
     :type flag_sha256: bool
-    :return: SHA256 checksum or an empty string on error or if no calculation is needed
-    :rtype: str
+    :param flag_blake3: calculate BLAKE3 checksum
+    :type flag_blake3: bool
+    :return: (SHA256 checksum, BLAKE3 checksum), each is None on error or if not needed
+    :rtype: (str, str)
     """
-    sha256_str: str = None
-    if flag_sha256:
+    sha256_str, blake3_str = None, None
+    if flag_sha256 or flag_blake3:
+        names: str = ' and '.join(name for name, flag in (('SHA256', flag_sha256), ('BLAKE3', flag_blake3)) if flag)
         try:
-            sha256_str = sha256_checksum(filename)
+            sha256_str, blake3_str = file_checksums(filename, flag_sha256, flag_blake3)
         except PermissionError:
             print_error(
-                f'Permission error when tried to calculate SHA256 for file: {correct_utf8_pathstring(filename)}')
+                f'Permission error when tried to calculate {names} for file: {correct_utf8_pathstring(filename)}')
         except Exception as e:
             print_error(
-                f'Exception "{repr(e)}" was caught when tried to calculate SHA256 for file: {correct_utf8_pathstring(filename)}')
-    return sha256_str
+                f'Exception "{repr(e)}" was caught when tried to calculate {names} for file: {correct_utf8_pathstring(filename)}')
+    return sha256_str, blake3_str
+
+
+class ChecksumsProcessPool:
+    """
+    Worker processes to calculate checksums of big files with (see checksums_job).
+    If a worker process dies (killed by a signal or out of memory), ProcessPoolExecutor becomes broken forever,
+    so it's replaced by a new one and the file is hashed by the calling thread instead.
+    """
+
+    def __init__(self, max_workers: int):
+        import concurrent.futures
+        import multiprocessing
+        # Workers are started by the pool lazily, when threads are already running.
+        # Forking a multi-threaded process may leave locks (like PRINT_LOCK) held in the child forever,
+        # so workers are started by a clean forkserver process (or spawned where it's not available).
+        mp_context_name: str = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.mp_context = multiprocessing.get_context(mp_context_name)
+        self.max_workers: int = max_workers
+        self.lock: threading.Lock = threading.Lock()
+        self.executor: concurrent.futures.ProcessPoolExecutor = self.create_executor()
+
+    def create_executor(self):
+        """
+        Create a new executor with the same context and number of workers.
+
+        :return: new executor
+        :rtype: concurrent.futures.ProcessPoolExecutor
+        """
+        import concurrent.futures
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+
+    def checksums(self, filename: str, flag_sha256: bool, flag_blake3: bool) -> (str, str):
+        """
+        Calculate checksums for the file by a worker process, the calling thread waits for them.
+
+        :param filename: path of file to calculate the checksums of
+        :type filename: str
+        :param flag_sha256: calculate SHA256 checksum
+        :type flag_sha256: bool
+        :param flag_blake3: calculate BLAKE3 checksum
+        :type flag_blake3: bool
+        :return: (SHA256 checksum, BLAKE3 checksum), each is None on error or if not needed
+        :rtype: (str, str)
+        """
+        import concurrent.futures.process
+
+        executor: concurrent.futures.ProcessPoolExecutor = self.executor
+        try:
+            return executor.submit(checksums_job, filename, flag_sha256, flag_blake3).result()
+        except concurrent.futures.process.BrokenProcessPool:
+            # All files that were in the broken pool get here, but the pool is replaced only once
+            with self.lock:
+                if self.executor is executor:
+                    print_error(
+                        f'Worker process for checksums has died, a new pool of workers is started while hashing file: {correct_utf8_pathstring(filename)}')
+                    self.executor = self.create_executor()
+                    executor.shutdown(wait=False)
+            return checksums_job(filename, flag_sha256, flag_blake3)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()
+
+
+def scantree(source_path: str, output_path: str):
+    """
+    Recursively scan the source directory top-down using os.scandir (symlinks are not followed).
+    Yields subdirectories and files as os.DirEntry that keep the type and stat
+    already known from reading the directory, so they are not requested again.
+    Content of not accessible directories is skipped silently like os.walk does.
+
+    :param source_path: path of the source directory to scan
+    :type source_path: str
+    :param output_path: path of the output directory matching the source one
+    :type output_path: str
+    :return: iterator over (source path, output path, subdirectories, files) for each directory
+    :rtype: Iterator[(str, str, list, list)]
+    """
+    # An explicit stack instead of recursion, so the depth of the tree is not limited by the recursion limit
+    stack: list = [(source_path, output_path)]
+    while stack:
+        source_path, output_path = stack.pop()
+        try:
+            with os.scandir(source_path) as it:
+                entries: list = list(it)
+        except OSError:
+            continue
+
+        directories: list = []
+        files: list = []
+        for entry in entries:
+            try:
+                is_dir: bool = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                directories.append(entry)
+            else:
+                files.append(entry)
+
+        yield (source_path, output_path, directories, files)
+
+        # Pushed in reverse order to be popped in the order of the listing, top-down like before
+        for entry in reversed(directories):
+            if not entry.is_symlink():
+                stack.append((entry.path, os.path.join(output_path, entry.name)))
+
+
+def walk_one_file(f: os.DirEntry,
+                  output_prefix: str,
+                  flag_source_is_cfsfiles: bool,
+                  flag_sha256: bool,
+                  flag_blake3: bool,
+                  flag_continue: bool,
+                  cfsfile_formatter: Callable[[CFSFile], bytearray],
+                  cfsfile_creator: Callable[[os.stat_result], CFSFile],
+                  checksums_pool: ChecksumsProcessPool = None,
+                  output_dir_fd: int = None,
+                  is_output_checked: bool = False,
+                  output_st: os.stat_result = None) -> None:
+    """
+    Index one file found by walktree and report if it was skipped.
+    All exceptions are caught, so it's safe to call it from a worker thread.
+
+    :param f: entry of the source file
+    :type f: os.DirEntry
+    :param output_prefix: path of output directory to place the index file to, with trailing separator
+    :type output_prefix: str
+    :param flag_source_is_cfsfiles: source directory has only CatalogFS-files already
+    :type flag_source_is_cfsfiles: bool
+    :param flag_sha256: calculate and store SHA256 checksum (much slower)
+    :type flag_sha256: bool
+    :param flag_blake3: calculate and store BLAKE3 checksum
+    :type flag_blake3: bool
+    :param flag_continue: continue indexing (ignore and skip existing output files)
+    :type flag_continue: bool
+    :param cfsfile_formatter: function that formats CFSFile to the content of the output file (see get_cfsfile_formatter)
+    :type cfsfile_formatter: Callable[[CFSFile], bytearray]
+    :param cfsfile_creator: function that creates CFSFile from the source file's stat (see get_cfsfile_creator)
+    :type cfsfile_creator: Callable[[os.stat_result], CFSFile]
+    :param checksums_pool: worker processes to calculate checksums of big files with, defaults to None (calculated by this thread)
+    :type checksums_pool: ChecksumsProcessPool, optional
+    :param output_dir_fd: descriptor of the output directory to create output file in, defaults to None (path is used)
+    :type output_dir_fd: int, optional
+    :param is_output_checked: output file was already checked by the caller (see output_st), defaults to False
+    :type is_output_checked: bool, optional
+    :param output_st: lstat of output file if it was checked by the caller and exists, defaults to None
+    :type output_st: os.stat_result, optional
+    """
+
+    res: bool = False
+    try:
+
+        source_file: str = f.path
+        output_cfsfile_file: str = output_prefix + f.name
+        #path_to_save: Path = source_file.relative_to(root_source_path)
+
+        if not is_correct_utf8_pathstring(source_file):
+            # I decided to process files with incorrect (non utf-8) names
+            print_error(
+                f'File has incorrect UTF-8 name or path but still will be processed: {correct_utf8_pathstring(source_file)}')
+
+        # NOTE: I decided to process files with incorrect (non utf-8) names
+        # should_we_continue = not is_correct_utf8
+        should_we_continue = True
+
+        skip_existing: bool = flag_continue
+        existing: bool = None
+        is_hashed: bool = False
+        sha256_str, blake3_str = None, None
+        is_hashing_needed: bool = (flag_sha256 or flag_blake3) and entry_matches_type(f, stat.S_IFREG)
+        if should_we_continue and (skip_existing or is_hashing_needed):
+            # Don't waste time on checksums for the output file that will not be created.
+            # When continuing, most of output files usually exist, so nothing is done for them before the check.
+            if not is_output_checked or output_st is not None:
+                existing = check_existing_output(output_cfsfile_file, output_dir_fd, skip_existing,
+                                                 flag_directory=False, output_st=output_st)
+            is_output_checked = True
+
+        if should_we_continue and existing is None and is_hashing_needed:
+            if (checksums_pool is not None
+                    and f.stat(follow_symlinks=False).st_size >= CHECKSUMS_PROCESS_MIN_SIZE):
+                # Hashing of big file is CPU-bound, so it's done by a worker process while this thread waits
+                sha256_str, blake3_str = checksums_pool.checksums(source_file, flag_sha256, flag_blake3)
+            else:
+                sha256_str, blake3_str = checksums_job(source_file, flag_sha256, flag_blake3)
+            is_hashed = True
+
+        if existing is not None:
+            res = existing
+        elif should_we_continue:
+            res = process_one_file(
+                source_file=source_file,
+                output_cfsfile_file=output_cfsfile_file,
+                skip_existing=skip_existing,
+                flag_source_is_cfsfile=flag_source_is_cfsfiles,
+                flag_sha256=flag_sha256 and not is_hashed,
+                flag_blake3=flag_blake3 and not is_hashed,
+                cfsfile_formatter=cfsfile_formatter,
+                cfsfile_creator=cfsfile_creator,
+                sha256_str=sha256_str,
+                blake3_str=blake3_str,
+                output_dir_fd=output_dir_fd,
+                entry=f,
+                is_output_checked=is_output_checked and output_st is None)
+
+    except Exception as e:
+        res = False
+        print_error(
+            f'Exception "{repr(e)}" was caught for file: {correct_utf8_pathstring(f.path)}')
+
+    if not res:
+        print_error(
+            f'File was skipped: {correct_utf8_pathstring(f.path)}')
 
 
-def walktree(root_source_path: Path,
-             root_output_path: Path,
+def walktree(root_source_path: os.PathLike,
+             root_output_path: os.PathLike,
              flag_source_is_cfsfiles: bool,
              flag_sha256: bool,
+             flag_blake3: bool,
              flag_continue: bool,
-             flag_data_only: bool,
-             flag_data_and_time_only: bool) -> None:
+             cfsfile_formatter: Callable[[CFSFile], bytearray],
+             cfsfile_creator: Callable[[os.stat_result], CFSFile],
+             jobs: int = 1) -> None:
     """
     Recursively walk around the source directory to index all files and store the results to the output directory accordingly
 
+    With more than one job walking, processing of files and checksums calculation work as a pipeline.
+    The main thread walks the tree and creates directories, files are processed by threads,
+    and they pass big files (see CHECKSUMS_PROCESS_MIN_SIZE) to worker processes for checksums calculation.
+    Walking stops when FILES_MAX_PENDING files are waiting to be processed.
+
     :param root_source_path: path of the source directory to make index of
-    :type root_source_path: Path
+    :type root_source_path: os.PathLike
     :param root_output_path: output directory for placing index files (preferably empty)
-    :type root_output_path: Path
+    :type root_output_path: os.PathLike
     :param flag_source_is_cfsfiles: source directory has only CatalogFS-files already
     :type flag_source_is_cfsfiles: bool
     :param flag_sha256: calculate and store SHA256 checksum (much slower)
     :type flag_sha256: bool
+    :param flag_blake3: calculate and store BLAKE3 checksum
+    :type flag_blake3: bool
     :param flag_continue: continue indexing (ignore and skip existing output files)
     :type flag_continue: bool
-    :param flag_data_only: store only information that is useful for comparing the file content (easy comparing and diff)
-    :type flag_data_only: bool
-    :param flag_data_and_time_only: store only information that is needed for comparing the file content and modification time
-    :type flag_data_and_time_only: bool
+    :param cfsfile_formatter: function that formats CFSFile to the content of the output file (see get_cfsfile_formatter)
+    :type cfsfile_formatter: Callable[[CFSFile], bytearray]
+    :param cfsfile_creator: function that creates CFSFile from the source file's stat (see get_cfsfile_creator)
+    :type cfsfile_creator: Callable[[os.stat_result], CFSFile]
+    :param jobs: number of worker threads for files and worker processes for checksums calculation, defaults to 1
+    :type jobs: int, optional
     """
-    for dirpath, directories, filenames in os.walk(root_source_path, topdown=True, followlinks=False):
-
-        source_path: Path = Path(dirpath)
-        dir_subpath: Path = Path(dirpath).relative_to(root_source_path)
-        output_path: Path = Path(root_output_path / dir_subpath)
+    files_executor: 'concurrent.futures.ThreadPoolExecutor' = None
+    files_pending: threading.BoundedSemaphore = None
+    checksums_pool: ChecksumsProcessPool = None
+    if jobs > 1:
+        import concurrent.futures
+        # Files are mostly waiting for I/O (stat, reading, writing), so they are processed by threads.
+        # Directories are still created by the main thread because parents must exist before children.
+        files_executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+        files_pending = threading.BoundedSemaphore(FILES_MAX_PENDING)
+        if flag_sha256 or flag_blake3:
+            checksums_pool = ChecksumsProcessPool(max_workers=jobs)
+
+    # Created directories are updated after all files are processed, their lstat is kept from scanning
+    created_directories: list = []
+    # Output directories (descriptors) with files that can be still processed by threads (futures)
+    directories_in_progress: list = []
+
+    for _, output_path, directories, files in scantree(os.fspath(root_source_path), os.fspath(root_output_path)):
+
+        # Output paths of entries are made by concatenation (no os.path.join for each entry)
+        output_prefix: str = os.path.join(output_path, '')
+
+        # Output directory is opened once, so the whole path is not resolved again for each of its entries.
+        # If it cannot be opened, then paths are used and errors are reported for each entry.
+        output_dir_fd: int = None
+        if FLAG_USE_DIR_FD:
+            try:
+                output_dir_fd = os.open(output_path, os.O_RDONLY | os.O_DIRECTORY)
+            except OSError:
+                pass
 
         # All directories in source_path
         for d in directories:
             try:
 
-                source_directory: Path = Path(source_path) / d
-                output_directory: Path = Path(output_path) / d
+                source_directory: str = d.path
+                output_directory: str = output_prefix + d.name
 
-                try:
-                    str(source_directory).encode('utf-8').decode('utf-8')
-                except UnicodeError:
+                if not is_correct_utf8_pathstring(source_directory):
                     # I decided to process directories with incorrect (non utf-8) names
                     print_error(
                         f'Directory has incorrect UTF-8 name or path but still will be processed: {correct_utf8_pathstring(source_directory)}')
 
-                st: os.stat_result = os.lstat(source_directory)
-                if stat.S_ISDIR(st.st_mode) and not os.access(source_directory, os.R_OK):
+                if entry_matches_type(d, stat.S_IFDIR) and not os.access(source_directory, os.R_OK):
                     print_error(
                         f'Directory is not accessible and its content will be skipped: {correct_utf8_pathstring(source_directory)}')
 
                 skip_existing: bool = flag_continue
-                create_directory(source_directory=source_directory,
-                                 output_directory=output_directory,
-                                 skip_existing=skip_existing)
+                st: os.stat_result = d.stat(follow_symlinks=False)
+                if create_directory(source_directory=source_directory,
+                                    output_directory=output_directory,
+                                    skip_existing=skip_existing,
+                                    st=st,
+                                    output_dir_fd=output_dir_fd):
+                    created_directories.append((source_directory, output_directory, st))
 
             except Exception as e:
-                res = False
                 print_error(
-                    f'Exception "{repr(e)}" was caught for directory: {correct_utf8_pathstring(source_directory)}')
+                    f'Exception "{repr(e)}" was caught for directory: {correct_utf8_pathstring(d.path)}')
 
         # Now all files in source_path
-        for f in filenames:
-
-            res: bool = False
-            try:
-
-                source_file: Path = Path(source_path) / f
-                output_cfsfile_file: Path = Path(output_path) / f
-                #path_to_save: Path = source_file.relative_to(root_source_path)
-
-                # is_correct_utf8: bool = False
-                try:
-                    str(source_file).encode('utf-8').decode('utf-8')
-                    # is_correct_utf8 = True
-                except UnicodeError:
-                    # I decided to process files with incorrect (non utf-8) names
-                    # is_correct_utf8 = False
-                    print_error(
-                        f'File has incorrect UTF-8 name or path but still will be processed: {correct_utf8_pathstring(source_file)}')
-
-                # NOTE: I decided to process files with incorrect (non utf-8) names
-                # should_we_continue = not is_correct_utf8
-                should_we_continue = True
-
-                skip_existing: bool = flag_continue
-                if should_we_continue:
-                    res = process_one_file(
-                        source_file=source_file,
-                        output_cfsfile_file=output_cfsfile_file,
-                        skip_existing=skip_existing,
-                        flag_source_is_cfsfile=flag_source_is_cfsfiles,
-                        flag_sha256=flag_sha256,
-                        flag_data_only=flag_data_only,
-                        flag_data_and_time_only=flag_data_and_time_only)
-
-            except Exception as e:
-                res = False
-                print_error(
-                    f'Exception "{repr(e)}" was caught for file: {correct_utf8_pathstring(Path(dirpath) / f)}')
-
-            if not res:
-                print_error(
-                    f'File was skipped: {correct_utf8_pathstring(Path(dirpath) / f)}')
+        walk_one_file_partial: Callable[[os.DirEntry], None] = functools.partial(
+            walk_one_file,
+            output_prefix=output_prefix,
+            flag_source_is_cfsfiles=flag_source_is_cfsfiles,
+            flag_sha256=flag_sha256,
+            flag_blake3=flag_blake3,
+            flag_continue=flag_continue,
+            cfsfile_formatter=cfsfile_formatter,
+            cfsfile_creator=cfsfile_creator,
+            checksums_pool=checksums_pool,
+            output_dir_fd=output_dir_fd)
+        futures: list = []
+        if files_executor is not None:
+            for f in files:
+                files_pending.acquire()
+                future: concurrent.futures.Future = files_executor.submit(walk_one_file_partial, f)
+                future.add_done_callback(lambda _: files_pending.release())
+                futures.append(future)
+        elif flag_sha256 or flag_blake3:
+            is_next_output_checked: bool = False
+            next_output_st: os.stat_result = None
+            for index, f in enumerate(files):
+                is_output_checked, output_st = is_next_output_checked, next_output_st
+                is_next_output_checked, next_output_st = False, None
+                # Reading of the next regular file is started before hashing of the current one,
+                # but only if it will be hashed (files with existing output are skipped or reported).
+                # Result of the check is passed to walk_one_file, so output is not checked twice.
+                if index + 1 < len(files) and entry_matches_type(files[index + 1], stat.S_IFREG):
+                    next_output_file: str = output_prefix + files[index + 1].name
+                    is_next_output_checked = True
+                    try:
+                        next_output_st = os.lstat(path_for_dir_fd(next_output_file, output_dir_fd),
+                                                  dir_fd=output_dir_fd)
+                    except OSError:
+                        prefetch_file(files[index + 1].path)
+                walk_one_file_partial(f, is_output_checked=is_output_checked, output_st=output_st)
+        else:
+            for f in files:
+                walk_one_file_partial(f)
+
+        # Close output directories with all files processed
+        directories_in_progress.append((output_dir_fd, futures))
+        still_in_progress: list = []
+        for dir_fd, dir_futures in directories_in_progress:
+            if not all(future.done() for future in dir_futures):
+                still_in_progress.append((dir_fd, dir_futures))
+            elif dir_fd is not None:
+                os.close(dir_fd)
+        directories_in_progress = still_in_progress
+
+    if files_executor is not None:
+        files_executor.shutdown()
+    for dir_fd, dir_futures in directories_in_progress:
+        if dir_fd is not None:
+            os.close(dir_fd)
+    if checksums_pool is not None:
+        checksums_pool.shutdown()
 
     # Modify permissions, uid/gid and utimes of directories in the whole tree
     # It should be after file creation because otherwise permissions
-    # can prevent from proper indexing
-    for dirpath, directories, filenames in os.walk(root_source_path, topdown=True, followlinks=False):
-
-        source_path: Path = Path(dirpath)
-        dir_subpath: Path = Path(dirpath).relative_to(root_source_path)
-        output_path: Path = Path(root_output_path / dir_subpath)
-
-        for d in directories:
-            try:
-
-                source_directory: Path = Path(source_path) / d
-                output_directory: Path = Path(output_path) / d
+    # can prevent from proper indexing.
+    # Directories are updated bottom-up, so updating of a child does not change mtime of its parent.
+    for source_directory, output_directory, st in reversed(created_directories):
+        try:
 
-                update_directory(source_directory,
-                                 output_directory)
+            update_directory(source_directory,
+                             output_directory,
+                             st=st)
 
-            except Exception as e:
-                res = False
-                print_error(
-                    f'Exception "{repr(e)}" was caught for directory: {correct_utf8_pathstring(source_directory)}')
+        except Exception as e:
+            print_error(
+                f'Exception "{repr(e)}" was caught for directory: {correct_utf8_pathstring(source_directory)}')
 
 
 def main() -> int:
@@ -1218,6 +1878,8 @@ def main() -> int:
     :return: 0 on success, non-zero on error
     :rtype: int
     """
+    import argparse
+    from pathlib import Path
 
     parser = argparse.ArgumentParser(
         description='Make a CatalogFS-compartible index (snapshot) of the source directory.',
@@ -1229,6 +1891,8 @@ def main() -> int:
 
     parser.add_argument('-s', '--sha256', dest='flag_sha256', action='store_true',
                         help='calculate and store SHA256 hashes (much slower)')
+    parser.add_argument('-b', '--blake3', dest='flag_blake3', action='store_true',
+                        help='calculate and store BLAKE3 hashes (requires blake3 module, index-only field that other CatalogFS tools may not support)')
     parser.add_argument('-c', '--continue', dest='flag_continue', action='store_true',
                         help='continue indexing (ignore and skip existing output files)')
     parser.add_argument('-d', '--data-only', dest='flag_data_only', action='store_true',
@@ -1237,21 +1901,50 @@ def main() -> int:
                         help='store only information that is needed for comparing the file content and modification time')
     parser.add_argument('-x', '--source-is-cfsfiles', dest='flag_source_is_cfsfiles', action='store_true',
                         help='source directory already has only CatalogFS-files (small files with meta-information)')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of parallel threads for files and processes for hashes calculation (default is the number of CPUs)')
+    parser.add_argument('-q', '--quiet', dest='flag_quiet', action='store_true',
+                        help='print only errors (no messages about every listed file and directory)')
     args = parser.parse_args()
 
     source_dir_input: str = args.source_dir
     output_dir_input: str = args.output_dir
     flag_source_is_cfsfiles: bool = args.flag_source_is_cfsfiles
     flag_sha256: bool = args.flag_sha256
+    flag_blake3: bool = args.flag_blake3
     flag_continue: bool = args.flag_continue
     flag_data_only: bool = args.flag_data_only
     flag_data_and_time_only: bool = args.flag_data_and_time_only
+    jobs: int = args.jobs
+    flag_quiet: bool = args.flag_quiet
+
+    if flag_quiet:
+        # print_ok is replaced once instead of checking the flag for every file
+        global print_ok
+        print_ok = print_nothing
 
     if flag_source_is_cfsfiles and flag_sha256:
         print_error(
             f'SHA256 calculation cannot be used when source files are CatalogFS-files.')
         return -5
 
+    if flag_source_is_cfsfiles and flag_blake3:
+        print_error(
+            f'BLAKE3 calculation cannot be used when source files are CatalogFS-files.')
+        return -5
+
+    if flag_blake3:
+        import importlib.util
+        # Only presence of the module is checked here, it's imported where checksums are calculated
+        if importlib.util.find_spec('blake3') is None:
+            print_error(
+                f'BLAKE3 calculation requires blake3 module (pip install blake3).')
+            return -7
+
+    if jobs < 1:
+        print_error(f'Number of jobs should be at least 1.')
+        return -6
+
     try:
         source_dir = Path(source_dir_input).resolve(strict=True)
     except FileNotFoundError:
@@ -1269,10 +1962,8 @@ def main() -> int:
         print_error(
             f'Output directory does not exist, it will be created.')
 
-        # if does_exist(output_directory, stat.S_IFDIR):
         Path(output_dir_input).mkdir(parents=True, exist_ok=False)
-        print_ok(
-            f'Output directory was created: {correct_utf8_pathstring(output_dir_input)}')
+        print_ok('Output directory was created', output_dir_input)
 
         # try to resolve again
         try:
@@ -1288,9 +1979,13 @@ def main() -> int:
              output_dir,
              flag_source_is_cfsfiles=flag_source_is_cfsfiles,
              flag_sha256=flag_sha256,
+             flag_blake3=flag_blake3,
              flag_continue=flag_continue,
-             flag_data_only=flag_data_only,
-             flag_data_and_time_only=flag_data_and_time_only)
+             cfsfile_formatter=get_cfsfile_formatter(flag_data_only,
+                                                     flag_data_and_time_only),
+             cfsfile_creator=get_cfsfile_creator(flag_data_only,
+                                                 flag_data_and_time_only),
+             jobs=jobs)
 
     return 0
 